@@ -1,20 +1,31 @@
 # load_data.py
 import pandas as pd
-from sqlalchemy import create_engine
 import os
 from dotenv import load_dotenv  # Import the library to read .env
+from utils import create_etl_engine, fast_to_sql
 
 # Load environment variables from the .env file
 load_dotenv()
 
 # 1. EXTRACT: READ THE CSV FILE
 file_path = 'WA_Fn-UseC_-Telco-Customer-Churn.csv'
-df = pd.read_csv(file_path)
+
+# Fixed schema so the C parser converts each column directly instead of inferring types;
+# TotalCharges has blanks and is parsed as text once. Integer columns are narrowed (they map
+# to INTEGER/SMALLINT losslessly); the charge columns stay float64 so SUMs keep their cents.
+DTYPES = {
+    'customerID': str, 'gender': str, 'SeniorCitizen': 'int8', 'Partner': str,
+    'Dependents': str, 'tenure': 'int32', 'PhoneService': str, 'MultipleLines': str,
+    'InternetService': str, 'OnlineSecurity': str, 'OnlineBackup': str,
+    'DeviceProtection': str, 'TechSupport': str, 'StreamingTV': str,
+    'StreamingMovies': str, 'Contract': str, 'PaperlessBilling': str,
+    'PaymentMethod': str, 'MonthlyCharges': 'float64', 'TotalCharges': str, 'Churn': str
+}
+df = pd.read_csv(file_path, dtype=DTYPES)
 print("CSV file loaded successfully!")
 
 # 2. TRANSFORM: CLEAN THE DATA
-df['TotalCharges'] = pd.to_numeric(df['TotalCharges'], errors='coerce')
-df['TotalCharges'].fillna(0, inplace=True)
+df['TotalCharges'] = pd.to_numeric(df['TotalCharges'], errors='coerce').fillna(0.0)
 print("'TotalCharges' column cleaned.")
 
 # 3. LOAD: CONNECT TO THE DATABASE AND UPLOAD THE DATA
@@ -26,8 +37,8 @@ if not database_url:
     raise ValueError("ERROR: DATABASE_URL not found in .env file. Please check your setup.")
 
 # Create the engine object that knows how to talk to your database
-engine = create_engine(database_url)
+engine = create_etl_engine(database_url)
 
 # 4. UPLOAD THE CLEANED DATA TO THE SQL TABLE
-df.to_sql('telco_churn', engine, if_exists='replace', index=False)
+fast_to_sql(df, 'telco_churn', engine)
 print("Data successfully loaded into the 'telco_churn' table in PostgreSQL!")
\ No newline at end of file
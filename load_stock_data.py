@@ -1,50 +1,92 @@
 # load_stock_data.py
 import yfinance as yf
 import pandas as pd
-from sqlalchemy import create_engine
 from dotenv import load_dotenv
+from utils import create_etl_engine, fast_to_sql
 import os
 import re
 
 # 1. Load database credentials from .env file
 load_dotenv()
 database_url = os.getenv('DATABASE_URL')
-engine = create_engine(database_url)
+engine = create_etl_engine(database_url)
 
 # 2. Define the stock ticker and period
 ticker = "VZ"  # Verizon stock ticker
-start_date = "2010-01-01"
+full_start_date = "2010-01-01"
+start_date = full_start_date
 end_date = "2024-12-31"
 
-# 3. Download historical stock data
-stock_data = yf.download(ticker, start=start_date, end=end_date)
-
-# 4. Reset index to make 'Date' a column and clean up the data
-stock_data.reset_index(inplace=True)
-
-# 4.1 FIXED: CLEAN THE COLUMN NAMES (Handle tuples)
-# Extract the first element of each tuple (the actual column name)
-# Then clean any special characters and convert to lowercase
-clean_columns = []
-for col in stock_data.columns:
-    if isinstance(col, tuple):
-        # Take the first part of the tuple (e.g., 'Date' from ('Date', ''))
-        col_name = str(col[0])
-    else:
-        col_name = str(col)
+# 3. Download historical stock data (only the days missing from the local cache)
+# auto_adjust=False keeps raw prices (plus 'adj close'), so rows downloaded on different
+# days stay on the same basis when they're appended to the cache
+def download_stock_data(start):
+    data = yf.download(ticker, start=start, end=end_date, auto_adjust=False)
+    if data.empty:
+        return data
+
+    # 4. Reset index to make 'Date' a column and clean up the data
+    data.reset_index(inplace=True)
+
+    # 4.1 FIXED: CLEAN THE COLUMN NAMES (Handle tuples)
+    # Extract the first element of each tuple (the actual column name)
+    # Then clean any special characters and convert to lowercase
+    invalid_chars = re.compile(r'[^a-zA-Z0-9_]')
+    clean_columns = []
+    for col in data.columns:
+        if isinstance(col, tuple):
+            # Take the first part of the tuple (e.g., 'Date' from ('Date', ''))
+            col_name = str(col[0])
+        else:
+            col_name = str(col)
     
-    # Remove any non-alphanumeric characters except underscores
-    clean_name = re.sub(r'[^a-zA-Z0-9_]', '', col_name).lower()
-    clean_columns.append(clean_name)
+        # Remove any non-alphanumeric characters except underscores
+        clean_name = invalid_chars.sub('', col_name).lower()
+        clean_columns.append(clean_name)
+
+    data.columns = clean_columns
+    data['ticker'] = ticker  # Add a column to identify the stock
+    return data
+
+cache_path = f"{ticker.lower()}_cache.parquet"
+cached_data = None
+if os.path.exists(cache_path):
+    cached_data = pd.read_parquet(cache_path)
+
+# A cache without 'adj close' holds auto-adjusted prices, so it can't be extended with raw rows
+if cached_data is not None and 'adjclose' not in cached_data.columns:
+    print("Cached data has adjusted prices, re-downloading the full history")
+    cached_data = None
+
+if cached_data is not None:
+    start_date = (cached_data['date'].max() + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+    print(f"Loaded {len(cached_data)} cached rows, fetching from {start_date}")
+
+stock_data = download_stock_data(start_date) if start_date < end_date else pd.DataFrame()
 
-stock_data.columns = clean_columns
-stock_data['ticker'] = ticker  # Add a column to identify the stock
+# 4.2 Merge the new rows into the cache and save it for the next run (only when there are new rows)
+if not stock_data.empty:
+    if cached_data is not None:
+        if list(cached_data.columns) == list(stock_data.columns):
+            stock_data = pd.concat([cached_data, stock_data], ignore_index=True)
+        else:
+            # Cache was written with a different column layout (e.g. another yfinance version)
+            print("Cached columns don't match the new download, re-downloading the full history")
+            stock_data = download_stock_data(full_start_date)
+            if stock_data.empty:
+                raise ValueError(f"ERROR: Full re-download for {ticker} returned no data. Check your network connection and try again.")
+    stock_data.to_parquet(cache_path, index=False)
+    print("Verizon (VZ) stock data downloaded successfully!")
+elif cached_data is not None:
+    stock_data = cached_data
+    print("No new stock data to download, using the cached Verizon (VZ) stock data.")
+else:
+    raise ValueError(f"ERROR: No stock data downloaded for {ticker} and no cache found. Check your network connection and try again.")
 
 # Show the first few rows
-print("Verizon (VZ) stock data downloaded successfully!")
 print(stock_data.head())
 print("\nColumns:", stock_data.columns.tolist())
 
 # 5. Load the data into a new table in PostgreSQL
-stock_data.to_sql('stock_data', engine, if_exists='replace', index=False)
+fast_to_sql(stock_data, 'stock_data', engine)
 print("Stock data successfully loaded into the 'stock_data' table in PostgreSQL!")
\ No newline at end of file
@@ -1,8 +1,8 @@
 # predictive_models.py
 import pandas as pd
 import numpy as np
-from sqlalchemy import create_engine
 from dotenv import load_dotenv
+from utils import create_etl_engine, fast_to_sql
 import os
 import json
 from datetime import datetime, timedelta
@@ -12,7 +12,6 @@ import logging
 from prophet import Prophet
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report, accuracy_score
-from sklearn.preprocessing import LabelEncoder
 import xgboost as xgb
 
 # Set up logging
@@ -23,7 +22,7 @@ def main():
     logger.info("Starting predictive model training...")
     load_dotenv()
     database_url = os.getenv('DATABASE_URL')
-    engine = create_engine(database_url)
+    engine = create_etl_engine(database_url)
 
     # --------------------------------------------------------------------
     # 1. SALES FORECASTING with Prophet
@@ -38,7 +37,8 @@ def main():
     model_prophet = Prophet(
         yearly_seasonality=True,
         weekly_seasonality=True,
-        daily_seasonality=False
+        daily_seasonality=False,
+        stan_backend='CMDSTANPY'
     )
     model_prophet.fit(sales_df)
     
@@ -47,7 +47,7 @@ def main():
     forecast = model_prophet.predict(future)
     
     # Save the forecast results to the database for the dashboard
-    forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].to_sql('sales_forecast', engine, if_exists='replace', index=False)
+    fast_to_sql(forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']], 'sales_forecast', engine)
     logger.info("Sales forecast saved to 'sales_forecast' table.")
     
     # --------------------------------------------------------------------
@@ -71,17 +71,17 @@ def main():
     """
     churn_df = pd.read_sql(query, engine)
     
-    # Preprocess categorical variables using Label Encoding
+    # Preprocess categorical variables using sorted category codes (same encoding as LabelEncoder)
     label_encoders = {}
     categorical_cols = ["Contract", "InternetService", "OnlineSecurity", "TechSupport", "PaymentMethod"]
     
     for col in categorical_cols:
-        le = LabelEncoder()
-        churn_df[col] = le.fit_transform(churn_df[col].astype(str))
-        label_encoders[col] = le
+        cat = churn_df[col].astype('category')
+        churn_df[col] = cat.cat.codes
+        label_encoders[col] = cat.cat.categories.tolist()
     
     # Convert target variable 'Churn'
-    churn_df['Churn'] = churn_df['Churn'].apply(lambda x: 1 if x == 'Yes' else 0)
+    churn_df['Churn'] = (churn_df['Churn'].values == 'Yes').astype(np.int8)
     
     # Define features (X) and target (y)
     X = churn_df.drop('Churn', axis=1)
@@ -90,18 +90,27 @@ def main():
     # Split the data into training and testing sets
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
     
+    # Materialize contiguous float32 features (what XGBoost uses internally) so training skips the conversion copy
+    feature_names = list(X.columns)
+    X_train = np.ascontiguousarray(X_train.values, dtype=np.float32)
+    X_test = np.ascontiguousarray(X_test.values, dtype=np.float32)
+    
+    # QuantileDMatrix bins the features once up front for the hist tree method
+    dtrain = xgb.QuantileDMatrix(X_train, label=y_train.values.astype(np.float32), feature_names=feature_names)
+    
     # Initialize and train the XGBoost model
-    model_xgb = xgb.XGBClassifier(
-        objective='binary:logistic',
-        n_estimators=100,
-        max_depth=6,
-        learning_rate=0.1,
-        use_label_encoder=False
-    )
-    model_xgb.fit(X_train, y_train)
+    # Histogram trees on all CPU cores, or on the GPU when XGB_DEVICE=cuda
+    params = {
+        'objective': 'binary:logistic',
+        'tree_method': 'hist',
+        'device': os.getenv('XGB_DEVICE', 'cpu'),
+        'max_depth': 6,
+        'learning_rate': 0.1
+    }
+    model_xgb = xgb.train(params, dtrain, num_boost_round=100)
     
     # Make predictions and evaluate the model
-    y_pred = model_xgb.predict(X_test)
+    y_pred = (model_xgb.inplace_predict(X_test) > 0.5).astype(int)
     accuracy = accuracy_score(y_test, y_pred)
     logger.info(f"XGBoost Model Accuracy: {accuracy:.4f}")
     logger.info("\nClassification Report:\n" + classification_report(y_test, y_pred))
@@ -111,8 +120,7 @@ def main():
     
     # Save the label encoders for use in the dashboard/API
     with open('label_encoders.json', 'w') as f:
-        encoder_data = {col: list(le.classes_) for col, le in label_encoders.items()}
-        json.dump(encoder_data, f)
+        json.dump(label_encoders, f)
     
     logger.info("Churn prediction model saved as 'xgboost_churn_model.json'")
     logger.info("Label encoders saved as 'label_encoders.json'")
@@ -1,11 +1,11 @@
 # train_models.py
 import pandas as pd
 import numpy as np
-from faker import Faker
-from sqlalchemy import create_engine
+from sqlalchemy.types import Date
 from dotenv import load_dotenv
+from utils import create_etl_engine, fast_to_sql
 import os
-from datetime import datetime, timedelta
+from datetime import datetime
 import logging
 
 # Set up logging to see all output
@@ -26,7 +26,7 @@ def main():
             return
         
         logger.info(f"Database URL loaded: {database_url}")
-        engine = create_engine(database_url)
+        engine = create_etl_engine(database_url)
         
         # Test connection
         with engine.connect() as conn:
@@ -34,29 +34,24 @@ def main():
 
         # --- 2. Generate Synthetic Sales Data ---
         logger.info("Generating synthetic sales data")
-        fake = Faker()
         np.random.seed(42)  # For reproducible results
 
         # Create a date range for the last 3 years
         dates = pd.date_range(end=datetime.today(), periods=1095, freq='D') # 3 years of days
 
         # Generate synthetic sales data
-        sales_records = []
-        for date in dates:
-            # Simulate higher sales on weekdays and in certain months
-            is_weekday = date.weekday() < 5
-            month_factor = 1.2 if date.month in [11, 12] else 1.0  # Holiday season boost
-            
-            base_sales = np.random.normal(50000, 15000)  # Base daily sales
-            daily_sales = base_sales * (1.1 if is_weekday else 0.7) * month_factor
-            
-            sales_records.append({
-                'date': date,
-                'sales_amount': max(daily_sales, 10000),  # Ensure not negative
-                'units_sold': int(max(daily_sales / 100, 100))  # Mock unit count
-            })
-
-        sales_df = pd.DataFrame(sales_records)
+        # Simulate higher sales on weekdays and in certain months
+        is_weekday = dates.weekday < 5
+        month_factor = np.where(dates.month.isin([11, 12]), 1.2, 1.0)  # Holiday season boost
+        
+        base_sales = np.random.normal(50000, 15000, size=len(dates))  # Base daily sales
+        daily_sales = base_sales * np.where(is_weekday, 1.1, 0.7) * month_factor
+        
+        sales_df = pd.DataFrame({
+            'date': dates,
+            'sales_amount': np.maximum(daily_sales, 10000),  # Ensure not negative
+            'units_sold': np.maximum(daily_sales / 100, 100).astype(int)  # Mock unit count
+        })
         logger.info(f"Sales data generated: {len(sales_df)} rows")
 
         # --- 3. Generate REALISTIC Synthetic Customer Activity Data ---
@@ -76,62 +71,53 @@ def main():
         
         logger.info(f"Loaded {len(existing_customers_df)} customers from telco_churn table")
 
-        activity_records = []
-        total_logins_estimated = 0
-        total_tickets_estimated = 0
-
-        for index, customer in existing_customers_df.iterrows():
-            customer_id = customer['customerID']
-            tenure_months = customer['tenure']
-            
-            # --- Rule 1: Login Frequency based on Tenure & Engagement ---
-            # Base logins: 10-30 times per month. More engaged customers login more.
-            base_logins_per_month = np.random.randint(10, 30)
-            
-            # Long-term customers might be slightly less active recently
-            if tenure_months > 48:
-                engagement_factor = 0.8  # 20% less active
-            else:
-                engagement_factor = 1.0
-                
-            # Customers with add-ons (like TechSupport) are more engaged
-            if customer['TechSupport'] == 'Yes':
-                engagement_factor *= 1.2
-                
-            customer_logins = int(base_logins_per_month * tenure_months * engagement_factor)
-            total_logins_estimated += customer_logins
-            
-            # --- Rule 2: Support Ticket Probability based on Churn Risk ---
-            # High-risk factors: Fiber optic, no online security, month-to-month contract
-            is_high_risk = (
-                customer['InternetService'] == 'Fiber optic' and
-                customer['OnlineSecurity'] == 'No' and
-                customer['Contract'] == 'Month-to-month'
-            )
-            
-            # Base ticket probability is higher for high-risk customers
-            base_ticket_probability = 0.4 if is_high_risk else 0.1
-            
-            # Generate activity for each login
-            for i in range(customer_logins):
-                # Simulate a login date spread throughout the customer's tenure
-                login_date = fake.date_between(
-                    start_date=datetime.today() - timedelta(days=tenure_months*30),
-                    end_date='today'
-                )
-                
-                # Decide if this login resulted in a support ticket
-                raised_ticket = 1 if np.random.random() < base_ticket_probability else 0
-                total_tickets_estimated += raised_ticket
-                
-                activity_records.append({
-                    'customer_id': customer_id,
-                    'date': login_date,
-                    'login_count': 1,
-                    'support_tickets_raised': raised_ticket
-                })
-
-        activity_df = pd.DataFrame(activity_records)
+        # Generate every customer's activity in one vectorized pass instead of per login
+        customer_ids = existing_customers_df['customerID'].values
+        tenure = existing_customers_df['tenure'].values
+        
+        # --- Rule 1: Login Frequency based on Tenure & Engagement ---
+        # Base logins: 10-30 times per month. More engaged customers login more.
+        base_logins_per_month = np.random.randint(10, 30, size=len(existing_customers_df))
+        
+        # Long-term customers might be slightly less active recently (20% less active),
+        # customers with add-ons (like TechSupport) are more engaged
+        engagement_factor = (
+            np.where(tenure > 48, 0.8, 1.0) *
+            np.where(existing_customers_df['TechSupport'].values == 'Yes', 1.2, 1.0)
+        )
+        
+        logins_per_customer = (base_logins_per_month * tenure * engagement_factor).astype(int)
+        total_logins_estimated = int(logins_per_customer.sum())
+        
+        # --- Rule 2: Support Ticket Probability based on Churn Risk ---
+        # High-risk factors: Fiber optic, no online security, month-to-month contract
+        is_high_risk = (
+            (existing_customers_df['InternetService'].values == 'Fiber optic') &
+            (existing_customers_df['OnlineSecurity'].values == 'No') &
+            (existing_customers_df['Contract'].values == 'Month-to-month')
+        )
+        
+        # Base ticket probability is higher for high-risk customers
+        base_ticket_probability = np.where(is_high_risk, 0.4, 0.1)
+        
+        # Simulate login dates spread throughout each customer's tenure
+        today = np.datetime64(datetime.today().date())
+        day_offsets = np.random.randint(0, np.repeat(tenure * 30, logins_per_customer) + 1)
+        login_dates = today - day_offsets.astype('timedelta64[D]')
+        
+        # Decide if each login resulted in a support ticket
+        raised_tickets = (
+            np.random.random(total_logins_estimated) <
+            np.repeat(base_ticket_probability, logins_per_customer)
+        ).astype(int)
+        total_tickets_estimated = int(raised_tickets.sum())
+        
+        activity_df = pd.DataFrame({
+            'customer_id': np.repeat(customer_ids, logins_per_customer),
+            'date': login_dates,
+            'login_count': 1,
+            'support_tickets_raised': raised_tickets
+        })
         logger.info(f"Activity data generated: {len(activity_df)} total logins")
         logger.info(f"Average logins per customer: {len(activity_df) / len(existing_customers_df):.2f}")
         logger.info(f"Total support tickets estimated: {total_tickets_estimated}")
@@ -141,11 +127,11 @@ def main():
         logger.info("Loading data into PostgreSQL database")
         
         # Load sales data
-        sales_df.to_sql('sales_data', engine, if_exists='replace', index=False)
+        fast_to_sql(sales_df, 'sales_data', engine)
         logger.info("Sales data loaded into 'sales_data' table")
         
         # Load activity data
-        activity_df.to_sql('customer_activity', engine, if_exists='replace', index=False)
+        fast_to_sql(activity_df, 'customer_activity', engine, dtype={'date': Date})
         logger.info("Activity data loaded into 'customer_activity' table")
 
         logger.info("Synthetic sales and customer activity data generated and loaded successfully!")
@@ -0,0 +1,32 @@
+# utils.py
+import csv
+from io import StringIO
+from sqlalchemy import create_engine
+
+def create_etl_engine(database_url):
+    """Engine tuned for one-shot ETL scripts: a single pooled connection and batched executemany"""
+    # Default isolation is kept so a failed table replace rolls back instead of leaving it half loaded
+    return create_engine(
+        database_url,
+        pool_size=1,
+        max_overflow=0,
+        pool_pre_ping=False,
+        executemany_mode='values_plus_batch',
+        insertmanyvalues_page_size=10000
+    )
+
+def psql_copy(table, conn, keys, data_iter):
+    """pandas to_sql method that streams rows with PostgreSQL COPY instead of INSERTs"""
+    dbapi_conn = conn.connection
+    with dbapi_conn.cursor() as cur:
+        buf = StringIO()
+        csv.writer(buf).writerows(data_iter)
+        buf.seek(0)
+        
+        columns = ', '.join(f'"{k}"' for k in keys)
+        table_name = f'"{table.schema}"."{table.name}"' if table.schema else f'"{table.name}"'
+        cur.copy_expert(sql=f'COPY {table_name} ({columns}) FROM STDIN WITH CSV', file=buf)
+
+def fast_to_sql(df, name, engine, **kwargs):
+    """Replace a table with the DataFrame's rows, streamed through COPY in bounded chunks"""
+    df.to_sql(name, engine, if_exists='replace', index=False, method=psql_copy, chunksize=50000, **kwargs)